@@ -13,13 +13,15 @@ Features:
 
 Requirements:
 - scapy
-- scikit-learn
+- scikit-learn>=1.2
 - flask
 - flask-cors (NEW)
 - numpy
 - pandas
 - psutil
 - threading
+- pypcap (optional, faster batched capture)
+- numba (optional, compiles the per-packet detectors)
 """
 
 import os
@@ -29,40 +31,169 @@ import json
 import logging
 import threading
 import sqlite3
+import queue
+import itertools
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import defaultdict, deque, OrderedDict
 from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional, Tuple, Set
 
 try:
-    from scapy.all import sniff, IP, TCP, UDP, ICMP, ARP, Dot11, get_if_list
+    from scapy.all import conf, AsyncSniffer, IP, TCP, UDP, ICMP, ARP, Dot11, get_if_list
     from sklearn.ensemble import IsolationForest
     from sklearn.preprocessing import StandardScaler
     import numpy as np
     import pandas as pd
     import psutil
-    from flask import Flask, render_template_string, jsonify, request
+    from flask import Flask, Response, jsonify, request
     from flask_cors import CORS # NEW: Import CORS
     import ctypes
     import platform
 except ImportError as e:
     print(f"Required library not found: {e}")
-    print("Install with: pip install scapy scikit-learn flask numpy pandas psutil Flask-Cors") # Updated install message
+    print("Install with: pip install scapy 'scikit-learn>=1.2' flask numpy pandas psutil Flask-Cors") # Updated install message
     sys.exit(1)
 
+try:
+    import pcap  # pypcap: batched libpcap capture without per-packet Python dispatch
+except ImportError:
+    pcap = None
+
+try:
+    from numba import njit, types
+    from numba.typed import Dict as TypedDict
+except ImportError:
+    # Without numba the detector kernels below run as plain Python
+    def njit(*args, **kwargs):
+        return lambda func: func
+    TypedDict = None
+
 # Configuration
 CONFIG = {
     'INTERFACE': 'Intel(R) Wi-Fi 6 AX203',  # Auto-detect if None
     'MONITOR_DURATION': 3600,  # 1 hour
     'ANOMALY_THRESHOLD': 0.1,
+    'ML_N_ESTIMATORS': 100,
+    'ML_MAX_SAMPLES': 256,  # per-tree subsample size
+    'ML_RESERVOIR_SIZE': 5000,  # most recent feature rows kept for retraining
     'LOG_FILE': 'wifi_ids.log',
     'DB_FILE': 'wifi_ids.db',
+    'DB_FLUSH_INTERVAL': 0.2,  # seconds between batched database writes
+    'DB_BATCH_SIZE': 100,  # write early once this many alerts are waiting
     'WEB_PORT': 5000,
     'PACKET_BUFFER_SIZE': 10000,
     'ANALYSIS_INTERVAL': 60,  # seconds
-    'THREAT_RESPONSE_ENABLED': True
+    'THREAT_RESPONSE_ENABLED': True,
+    'ALERT_HISTORY_SIZE': 10000,  # alerts kept in memory; the database keeps all of them
+    'SUSPICIOUS_IP_TTL': 86400,  # seconds since an IP's last alert before it is forgotten
+    'CAPTURE_QUEUE_SIZE': 10000,  # raw frames waiting for dissection
+    'PORT_SCAN_WINDOW': 60,  # seconds
+    'PORT_SCAN_THRESHOLD': 20,  # unique destination ports
+    'DDOS_WINDOW': 10,  # seconds
+    'DDOS_THRESHOLD': 100,  # packets
+    'SUSPICIOUS_PORTS': [22, 23, 135, 139, 445, 1433, 3389, 5432, 5900, 6379]
 }
 
+# Numeric protocol ids for the columnar packet history
+PROTOCOL_IDS = {'TCP': 0, 'UDP': 1, 'ICMP': 2, 'ARP': 3, 'OTHER': 4}
+
+# IP header protocol numbers we classify
+IP_PROTOCOLS = {6: 'TCP', 17: 'UDP', 1: 'ICMP'}
+
+# Bits returned by update_and_detect
+PORT_SCAN_FLAG = 1
+SUSPICIOUS_PORT_FLAG = 2
+DDOS_FLAG = 4
+
+# Alert raised for each detector bit, indexed by bit position:
+# (threat type, severity, confidence, description template)
+DETECTORS = [
+    ('PORT_SCAN', 'HIGH', 0.8, "Port scan detected from {ip}"),
+    ('SUSPICIOUS_PORT', 'MEDIUM', 0.6, "Connection to suspicious port {port} from {ip}"),
+    ('DDOS', 'CRITICAL', 0.9, "Potential DDoS attack from {ip}")
+]
+
+# Columns of the per-IP window state. Each source's packets are chained
+# oldest to newest through the ring's 'next' column; a window is the run
+# of LEN packets starting at HEAD, DISTINCT counts the destination ports
+# inside the port scan window and IN_RING the source's packets anywhere
+# in the ring.
+TAIL, SCAN_HEAD, SCAN_LEN, DDOS_HEAD, DDOS_LEN, DISTINCT, IN_RING = range(7)
+IP_STATE_COLUMNS = 7
+
+@njit(cache=True)
+def _pop_window(next_arr, port_arr, ip_state, port_counts, code, head_col, len_col):
+    """Drop the oldest packet of one of code's windows"""
+    head = ip_state[code, head_col]
+    if head_col == SCAN_HEAD and port_arr[head]:
+        key = np.int64(code) * 65536 + np.int64(port_arr[head])
+        remaining = port_counts[key] - 1
+        if remaining:
+            port_counts[key] = remaining
+        else:
+            del port_counts[key]
+            ip_state[code, DISTINCT] -= 1
+    ip_state[code, head_col] = next_arr[head]
+    ip_state[code, len_col] -= 1
+
+@njit(cache=True)
+def update_and_detect(ts_arr, src_arr, port_arr, next_arr, slot, overwrite, now, code, port,
+                      ip_state, live_sources, port_counts, port_lut,
+                      scan_window, scan_threshold, ddos_window, ddos_threshold):
+    """Store a packet in ring slot, update its source's windows and return detector flags"""
+    # The packet being overwritten is the oldest in the ring, so if it is
+    # still inside its source's windows it is at their head
+    if overwrite:
+        old = src_arr[slot]
+        if ip_state[old, SCAN_LEN] and ip_state[old, SCAN_HEAD] == slot:
+            _pop_window(next_arr, port_arr, ip_state, port_counts, old, SCAN_HEAD, SCAN_LEN)
+        if ip_state[old, DDOS_LEN] and ip_state[old, DDOS_HEAD] == slot:
+            _pop_window(next_arr, port_arr, ip_state, port_counts, old, DDOS_HEAD, DDOS_LEN)
+        if ip_state[old, TAIL] == slot:
+            ip_state[old, TAIL] = -1
+        ip_state[old, IN_RING] -= 1
+        if not ip_state[old, IN_RING]:
+            live_sources[0] -= 1
+    
+    ts_arr[slot] = now
+    src_arr[slot] = code
+    port_arr[slot] = port
+    next_arr[slot] = -1
+    if ip_state[code, TAIL] >= 0:
+        next_arr[ip_state[code, TAIL]] = slot
+    ip_state[code, TAIL] = slot
+    if not ip_state[code, IN_RING]:
+        live_sources[0] += 1
+    ip_state[code, IN_RING] += 1
+    
+    if not ip_state[code, SCAN_LEN]:
+        ip_state[code, SCAN_HEAD] = slot
+    ip_state[code, SCAN_LEN] += 1
+    if not ip_state[code, DDOS_LEN]:
+        ip_state[code, DDOS_HEAD] = slot
+    ip_state[code, DDOS_LEN] += 1
+    if port:
+        key = np.int64(code) * 65536 + port
+        if key in port_counts:
+            port_counts[key] += 1
+        else:
+            port_counts[key] = 1
+            ip_state[code, DISTINCT] += 1
+    
+    while now - ts_arr[ip_state[code, SCAN_HEAD]] >= scan_window:
+        _pop_window(next_arr, port_arr, ip_state, port_counts, code, SCAN_HEAD, SCAN_LEN)
+    while now - ts_arr[ip_state[code, DDOS_HEAD]] >= ddos_window:
+        _pop_window(next_arr, port_arr, ip_state, port_counts, code, DDOS_HEAD, DDOS_LEN)
+    
+    flags = 0
+    if port and ip_state[code, DISTINCT] > scan_threshold:
+        flags |= PORT_SCAN_FLAG
+    if port_lut[port]:
+        flags |= SUSPICIOUS_PORT_FLAG
+    if ip_state[code, DDOS_LEN] > ddos_threshold:
+        flags |= DDOS_FLAG
+    return flags
+
 def is_admin():
     """Check if the script is running with administrator privileges"""
     try:
@@ -74,18 +205,6 @@ def is_admin():
     except:
         return False
 
-@dataclass
-class NetworkPacket:
-    """Represents a captured network packet"""
-    timestamp: float
-    src_ip: str
-    dst_ip: str
-    protocol: str
-    length: int
-    src_port: Optional[int] = None
-    dst_port: Optional[int] = None
-    flags: Optional[str] = None
-
 @dataclass
 class ThreatAlert:
     """Represents a security threat alert"""
@@ -101,13 +220,66 @@ class WiFiIDS:
     
     def __init__(self, config: Dict = None):
         self.config = config or CONFIG
-        self.packet_buffer = deque(maxlen=self.config['PACKET_BUFFER_SIZE'])
         self.connection_tracker = defaultdict(int)
-        self.suspicious_ips = set()
-        self.threat_alerts = []
+        # Packet buffer as a ring of preallocated columns, one row per packet.
+        # Rows are written round-robin at _head; source IPs are interned to int
+        # codes and a port of 0 means the packet had none.
+        size = self.config['PACKET_BUFFER_SIZE']
+        self._ring = {
+            'ts': np.zeros(size, dtype=np.float64),
+            'src': np.zeros(size, dtype=np.int32),
+            'dport': np.zeros(size, dtype=np.uint16),
+            'proto': np.zeros(size, dtype=np.uint8),
+            'flags': np.zeros(size, dtype=np.uint16),  # TCP flags are 9 bits
+            'length': np.zeros(size, dtype=np.int32),
+            'next': np.full(size, -1, dtype=np.int64)
+        }
+        self._head = 0
+        self._count = 0
+        # Codes are recycled once a source has no packets left in the ring, so
+        # the intern table and _ip_state stay proportional to the ring size
+        self._ip_codes = {}
+        self._ip_names = []
+        self._free_codes = []
+        # Codes released while extract_features is reading the ring wait here,
+        # so a row can't be labelled with an IP that took over its code
+        self._pending_codes = []
+        self._reading_ring = False
+        self._codes_lock = threading.Lock()
+        # Per-IP sliding window state for update_and_detect, one row per IP
+        # code (grown as new IPs are interned), and the number of packets per
+        # (code, port) pair inside each port scan window
+        self._ip_state = np.zeros((1024, IP_STATE_COLUMNS), dtype=np.int64)
+        self._ip_state[:, TAIL] = -1
+        # Number of distinct source IPs with packets in the ring
+        self._live_sources = np.zeros(1, dtype=np.int64)
+        self._port_counts = self.new_port_counts()
+        # One byte per destination port, 1 for ports flagged as suspicious
+        self._suspicious_port_lut = np.zeros(65536, dtype=np.uint8)
+        self._suspicious_port_lut[self.config['SUSPICIOUS_PORTS']] = 1
+        # IP -> time of its latest alert, oldest first
+        self.suspicious_ips = OrderedDict()
+        self.threat_alerts = deque(maxlen=self.config['ALERT_HISTORY_SIZE'])
+        self._alerts_lock = threading.Lock()
         self.is_monitoring = False
         self.ml_model = None
         self.scaler = StandardScaler()
+        self._feature_reservoir = np.empty((0, 4))
+        
+        # Pending database writes, flushed in batches by the writer thread
+        self._alert_queue = queue.Queue()
+        self._stats_queue = queue.Queue()
+        self._db_lock = threading.Lock()
+        
+        # Each capture session gets its own stop event, so a session stopped
+        # just before a restart can't miss the signal; the lock keeps a
+        # draining old session and a new one from feeding packet_callback at
+        # the same time
+        self._capture_stop = threading.Event()
+        self._capture_lock = threading.Lock()
+        self.dropped_packets = 0
+        # Set once the capture thread has entered its loop (or given up)
+        self._monitor_started = threading.Event()
         
         # Initialize logging
         self.setup_logging()
@@ -118,6 +290,13 @@ class WiFiIDS:
         # Initialize ML model
         self.init_ml_model()
         
+        # Compile the detector kernel before any packet is captured
+        self.warm_up_detectors()
+        
+        # Start database writer thread
+        self.writer_thread = threading.Thread(target=self.db_writer, daemon=True)
+        self.writer_thread.start()
+        
         # Start analysis thread
         self.analysis_thread = threading.Thread(target=self.continuous_analysis, daemon=True)
         self.analysis_thread.start()
@@ -141,43 +320,78 @@ class WiFiIDS:
     
     def init_database(self):
         """Initialize SQLite database for storing alerts and statistics"""
-        conn = sqlite3.connect(self.config['DB_FILE'])
-        cursor = conn.cursor()
-        
-        # Create tables
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS threats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp REAL,
-                threat_type TEXT,
-                severity TEXT,
-                source_ip TEXT,
-                description TEXT,
-                confidence REAL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS network_stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp REAL,
-                total_packets INTEGER,
-                unique_ips INTEGER,
-                suspicious_activities INTEGER
-            )
-        ''')
+        # A single long-lived connection shared by all threads. WAL lets the
+        # API endpoints read while the analysis thread writes, and
+        # synchronous=NORMAL drops the per-commit fsync of the rollback journal.
+        self.db_conn = sqlite3.connect(
+            self.config['DB_FILE'],
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self.db_conn.execute("PRAGMA journal_mode=WAL")
+        self.db_conn.execute("PRAGMA synchronous=NORMAL")
         
-        conn.commit()
-        conn.close()
+        with self._db_lock:
+            cursor = self.db_conn.cursor()
+            
+            # Create tables
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS threats (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL,
+                    threat_type TEXT,
+                    severity TEXT,
+                    source_ip TEXT,
+                    description TEXT,
+                    confidence REAL
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS network_stats (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL,
+                    total_packets INTEGER,
+                    unique_ips INTEGER,
+                    suspicious_activities INTEGER
+                )
+            ''')
+            
+            # Lets get_recent_alerts range-scan recent rows instead of the whole table
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_threats_ts ON threats(timestamp DESC)')
     
     def init_ml_model(self):
         """Initialize machine learning model for anomaly detection"""
         self.ml_model = IsolationForest(
             contamination=self.config['ANOMALY_THRESHOLD'],
+            n_estimators=self.config['ML_N_ESTIMATORS'],
+            max_samples=self.config['ML_MAX_SAMPLES'],
+            n_jobs=-1,
             random_state=42
         )
         self.logger.info("ML model initialized")
     
+    def new_port_counts(self):
+        """Empty (code, port) -> packet count mapping in the type update_and_detect expects"""
+        if TypedDict is not None:
+            return TypedDict.empty(key_type=types.int64, value_type=types.int64)
+        return {}
+    
+    def warm_up_detectors(self):
+        """Run update_and_detect once on a throwaway 1-slot ring so numba compiles it now"""
+        ring = self._ring
+        ip_state = np.zeros((1, IP_STATE_COLUMNS), dtype=np.int64)
+        ip_state[:, TAIL] = -1
+        update_and_detect(
+            np.zeros(1, dtype=ring['ts'].dtype), np.zeros(1, dtype=ring['src'].dtype),
+            np.zeros(1, dtype=ring['dport'].dtype), np.full(1, -1, dtype=ring['next'].dtype),
+            0, False, 0.0, 0, 0,
+            ip_state, np.zeros(1, dtype=np.int64), self.new_port_counts(), self._suspicious_port_lut,
+            self.config['PORT_SCAN_WINDOW'], self.config['PORT_SCAN_THRESHOLD'],
+            self.config['DDOS_WINDOW'], self.config['DDOS_THRESHOLD']
+        )
+        self.logger.info("Packet detectors compiled")
+    
     def get_network_interface(self) -> str:
         """Auto-detect or return configured network interface"""
         if self.config['INTERFACE']:
@@ -200,120 +414,102 @@ class WiFiIDS:
     
     def packet_callback(self, packet):
         """Process captured network packets"""
+        now = time.time()
         try:
-            if not packet.haslayer(IP):
-                return
-            
+            # Non-IP frames are already dropped by the capture's BPF filter
             ip_layer = packet[IP]
-            protocol = self.get_protocol(packet)
+            protocol = IP_PROTOCOLS.get(ip_layer.proto, 'OTHER')
+            transport = ip_layer.payload
+            dst_port = flags = 0
             
-            network_packet = NetworkPacket(
-                timestamp=time.time(),
-                src_ip=ip_layer.src,
-                dst_ip=ip_layer.dst,
-                protocol=protocol,
-                length=len(packet)
-            )
-            
-            # Add port information if available
-            if packet.haslayer(TCP):
-                tcp_layer = packet[TCP]
-                network_packet.src_port = tcp_layer.sport
-                network_packet.dst_port = tcp_layer.dport
-                network_packet.flags = str(tcp_layer.flags)
-            elif packet.haslayer(UDP):
-                udp_layer = packet[UDP]
-                network_packet.src_port = udp_layer.sport
-                network_packet.dst_port = udp_layer.dport
+            # Add port information if available (non-first fragments carry no header)
+            if protocol == 'TCP' and isinstance(transport, TCP):
+                dst_port = transport.dport
+                flags = int(transport.flags)
+            elif protocol == 'UDP' and isinstance(transport, UDP):
+                dst_port = transport.dport
             
-            self.packet_buffer.append(network_packet)
-            self.connection_tracker[network_packet.src_ip] += 1
+            src = self.intern_ip(ip_layer.src)
+            slot = self._head
+            ring = self._ring
+            overwrite = self._count == len(ring['ts'])
+            evicted = int(ring['src'][slot]) if overwrite else -1
+            ring['proto'][slot] = PROTOCOL_IDS[protocol]
+            ring['flags'][slot] = flags
+            ring['length'][slot] = len(packet)
             
             # Real-time threat detection
-            self.analyze_packet(network_packet)
+            detected = update_and_detect(
+                ring['ts'], ring['src'], ring['dport'], ring['next'], slot, overwrite,
+                now, src, dst_port,
+                self._ip_state, self._live_sources, self._port_counts, self._suspicious_port_lut,
+                self.config['PORT_SCAN_WINDOW'], self.config['PORT_SCAN_THRESHOLD'],
+                self.config['DDOS_WINDOW'], self.config['DDOS_THRESHOLD']
+            )
+            self._head = (slot + 1) % len(ring['ts'])
+            self._count = min(self._count + 1, len(ring['ts']))
+            if evicted >= 0 and not self._ip_state[evicted, IN_RING]:
+                self.release_ip(evicted)
+            
+            self.connection_tracker[ip_layer.src] += 1
+            if detected:
+                self.analyze_packet(slot, detected, now)
             
         except Exception as e:
             self.logger.error(f"Error processing packet: {e}")
     
-    def get_protocol(self, packet) -> str:
-        """Extract protocol information from packet"""
-        if packet.haslayer(TCP):
-            return 'TCP'
-        elif packet.haslayer(UDP):
-            return 'UDP'
-        elif packet.haslayer(ICMP):
-            return 'ICMP'
-        elif packet.haslayer(ARP):
-            return 'ARP'
-        else:
-            return 'OTHER'
+    def intern_ip(self, ip: str) -> int:
+        """Return the integer code for an IP address, assigning one if new"""
+        code = self._ip_codes.get(ip)
+        if code is None:
+            if self._free_codes:
+                code = self._free_codes.pop()
+                self._ip_names[code] = ip
+            else:
+                code = len(self._ip_names)
+                self._ip_names.append(ip)
+            self._ip_codes[ip] = code
+            if code == len(self._ip_state):
+                grown = np.zeros((2 * code, IP_STATE_COLUMNS), dtype=np.int64)
+                grown[:, TAIL] = -1
+                grown[:code] = self._ip_state
+                self._ip_state = grown
+        return code
     
-    def analyze_packet(self, packet: NetworkPacket):
-        """Analyze individual packet for threats"""
-        # Port scan detection
-        if self.detect_port_scan(packet):
-            self.create_threat_alert(
-                'PORT_SCAN',
-                'HIGH',
-                packet.src_ip,
-                f"Port scan detected from {packet.src_ip}",
-                0.8
-            )
-        
-        # Suspicious port detection
-        if self.detect_suspicious_port(packet):
-            self.create_threat_alert(
-                'SUSPICIOUS_PORT',
-                'MEDIUM',
-                packet.src_ip,
-                f"Connection to suspicious port {packet.dst_port} from {packet.src_ip}",
-                0.6
-            )
+    def release_ip(self, code: int):
+        """Return the code of a source with no packets left in the ring to the free list"""
+        del self._ip_codes[self._ip_names[code]]
+        self._ip_names[code] = None
+        self._ip_state[code] = 0
+        self._ip_state[code, TAIL] = -1
+        with self._codes_lock:
+            (self._pending_codes if self._reading_ring else self._free_codes).append(code)
+    
+    def analyze_packet(self, slot: int, detected: int, now: float):
+        """Raise alerts for the detectors that fired on the packet in ring slot"""
+        src_ip = self._ip_names[self._ring['src'][slot]]
+        port = self._ring['dport'][slot]
         
-        # DDoS detection
-        if self.detect_ddos(packet):
+        # Visit only the set bits, lowest first
+        while detected:
+            bit = detected & -detected
+            detected ^= bit
+            threat_type, severity, confidence, template = DETECTORS[bit.bit_length() - 1]
             self.create_threat_alert(
-                'DDOS',
-                'CRITICAL',
-                packet.src_ip,
-                f"Potential DDoS attack from {packet.src_ip}",
-                0.9
+                threat_type,
+                severity,
+                src_ip,
+                template.format(ip=src_ip, port=port),
+                confidence,
+                now
             )
     
-    def detect_port_scan(self, packet: NetworkPacket) -> bool:
-        """Detect port scanning activities"""
-        if not packet.dst_port:
-            return False
-        
-        # Check for multiple connections to different ports from same IP
-        recent_packets = [p for p in self.packet_buffer 
-                         if p.src_ip == packet.src_ip and 
-                         time.time() - p.timestamp < 60]
-        
-        unique_ports = set(p.dst_port for p in recent_packets if p.dst_port)
-        return len(unique_ports) > 20  # Threshold for port scan
-    
-    def detect_suspicious_port(self, packet: NetworkPacket) -> bool:
-        """Detect connections to suspicious ports"""
-        suspicious_ports = {
-            22, 23, 135, 139, 445, 1433, 3389, 5432, 5900, 6379
-        }
-        return packet.dst_port in suspicious_ports
-    
-    def detect_ddos(self, packet: NetworkPacket) -> bool:
-        """Detect DDoS attacks"""
-        # Simple rate-based detection
-        recent_count = sum(1 for p in self.packet_buffer 
-                          if p.src_ip == packet.src_ip and 
-                          time.time() - p.timestamp < 10)
-        return recent_count > 100  # Threshold for DDoS
-    
     def continuous_analysis(self):
         """Continuous analysis of network traffic using ML"""
         while True:
             try:
                 time.sleep(self.config['ANALYSIS_INTERVAL'])
-                if len(self.packet_buffer) > 100:
+                if self._count > 100:
                     self.ml_analysis()
                     self.update_statistics()
             except Exception as e:
@@ -323,66 +519,95 @@ class WiFiIDS:
         """Machine learning-based anomaly detection"""
         try:
             # Extract features from packet buffer
-            features = self.extract_features()
+            features, ip_list = self.extract_features()
             if len(features) < 10:
                 return
             
-            # Normalize features
-            features_scaled = self.scaler.fit_transform(features)
-            
-            # Train model if needed
-            if not hasattr(self.ml_model, 'offset_'):
-                self.ml_model.fit(features_scaled)
-                return
-            
-            # Detect anomalies
-            anomalies = self.ml_model.predict(features_scaled)
-            anomaly_scores = self.ml_model.decision_function(features_scaled)
+            # Normalize features with running statistics kept across intervals
+            self.scaler.partial_fit(features)
+            features_scaled = self.scaler.transform(features)
             
-            # Create alerts for anomalies
-            for i, (is_anomaly, score) in enumerate(zip(anomalies, anomaly_scores)):
-                if is_anomaly == -1:  # Anomaly detected
-                    packet = list(self.packet_buffer)[-(len(features) - i)]
+            # Detect anomalies with the model trained on previous intervals
+            if hasattr(self.ml_model, 'offset_'):
+                anomaly_scores = self.ml_model.decision_function(features_scaled)
+                
+                # Create alerts for anomalies (negative scores, as in IsolationForest.predict)
+                for i in np.where(anomaly_scores < 0)[0]:
                     self.create_threat_alert(
                         'ANOMALY',
                         'MEDIUM',
-                        packet.src_ip,
-                        f"Anomalous network behavior detected from {packet.src_ip}",
-                        abs(score)
+                        ip_list[i],
+                        f"Anomalous network behavior detected from {ip_list[i]}",
+                        abs(anomaly_scores[i])
                     )
+            
+            # Retrain on the most recent feature rows so the model follows the network
+            self._feature_reservoir = np.vstack(
+                [self._feature_reservoir, features]
+            )[-self.config['ML_RESERVOIR_SIZE']:]
+            self.train_model()
         
         except Exception as e:
             self.logger.error(f"Error in ML analysis: {e}")
     
-    def extract_features(self) -> List[List[float]]:
-        """Extract features from packet buffer for ML analysis"""
-        features = []
-        
-        # Group packets by source IP
-        ip_groups = defaultdict(list)
-        for packet in self.packet_buffer:
-            ip_groups[packet.src_ip].append(packet)
-        
-        for ip, packets in ip_groups.items():
-            if len(packets) < 5:
-                continue
+    def train_model(self):
+        """Fit the anomaly model on the feature reservoir"""
+        training = self.scaler.transform(self._feature_reservoir)
+        self.ml_model.set_params(
+            max_samples=min(self.config['ML_MAX_SAMPLES'], len(training))
+        )
+        self.ml_model.fit(training)
+    
+    def extract_features(self) -> Tuple[np.ndarray, List[str]]:
+        """Extract per-source features for ML analysis; ip_list[i] is the source of row i"""
+        # Hold back code reuse until the names for this snapshot are looked up
+        with self._codes_lock:
+            self._reading_ring = True
+        try:
+            n = self._count
+            if n == 0:
+                return np.empty((0, 4)), []
+            ring = self._ring
+            
+            # Group packets by source IP: sort by IP code, then every group is a
+            # contiguous run starting at `starts`
+            codes = ring['src'][:n].copy()
+            order = np.argsort(codes, kind='stable')
+            group_codes, starts, counts = np.unique(codes[order], return_index=True, return_counts=True)
+            ts = ring['ts'][:n][order]
+            length = ring['length'][:n][order]
+            dport = ring['dport'][:n][order].astype(np.int64)
+            proto = ring['proto'][:n][order].astype(np.int64)
+            group = np.repeat(np.arange(len(starts)), counts)
             
             # Calculate features
-            packet_rate = len(packets) / max(1, (max(p.timestamp for p in packets) - 
-                                               min(p.timestamp for p in packets)))
-            avg_packet_size = sum(p.length for p in packets) / len(packets)
-            unique_ports = len(set(p.dst_port for p in packets if p.dst_port))
-            protocol_diversity = len(set(p.protocol for p in packets))
+            duration = np.maximum.reduceat(ts, starts) - np.minimum.reduceat(ts, starts)
+            packet_rate = counts / np.maximum(1, duration)
+            avg_packet_size = np.add.reduceat(length, starts) / counts
+            has_port = dport > 0
+            port_pairs = np.unique(group[has_port] * 65536 + dport[has_port])
+            unique_ports = np.bincount(port_pairs // 65536, minlength=len(starts))
+            proto_pairs = np.unique(group * len(PROTOCOL_IDS) + proto)
+            protocol_diversity = np.bincount(proto_pairs // len(PROTOCOL_IDS), minlength=len(starts))
             
-            features.append([packet_rate, avg_packet_size, unique_ports, protocol_diversity])
-        
-        return features
+            features = np.column_stack([packet_rate, avg_packet_size, unique_ports, protocol_diversity])
+            # Skip codes released by the capture thread since the snapshot was taken
+            names = [self._ip_names[code] for code in group_codes]
+            keep = (counts >= 5) & np.array([name is not None for name in names], dtype=bool)
+            ip_list = [name for name, kept in zip(names, keep) if kept]
+            return features[keep], ip_list
+        finally:
+            with self._codes_lock:
+                self._reading_ring = False
+                self._free_codes.extend(self._pending_codes)
+                self._pending_codes.clear()
     
     def create_threat_alert(self, threat_type: str, severity: str, 
-                           source_ip: str, description: str, confidence: float):
+                           source_ip: str, description: str, confidence: float,
+                           timestamp: Optional[float] = None):
         """Create and store threat alert"""
         alert = ThreatAlert(
-            timestamp=time.time(),
+            timestamp=timestamp if timestamp is not None else time.time(),
             threat_type=threat_type,
             severity=severity,
             source_ip=source_ip,
@@ -390,8 +615,10 @@ class WiFiIDS:
             confidence=confidence
         )
         
-        self.threat_alerts.append(alert)
-        self.suspicious_ips.add(source_ip)
+        with self._alerts_lock:
+            self.threat_alerts.append(alert)
+            self.suspicious_ips[source_ip] = alert.timestamp
+            self.suspicious_ips.move_to_end(source_ip)
         
         # Store in database
         self.store_threat_alert(alert)
@@ -404,21 +631,63 @@ class WiFiIDS:
             self.respond_to_threat(alert)
     
     def store_threat_alert(self, alert: ThreatAlert):
-        """Store threat alert in database"""
+        """Queue threat alert for the next batched database write"""
+        self._alert_queue.put((alert.timestamp, alert.threat_type, alert.severity,
+                               alert.source_ip, alert.description, alert.confidence))
+    
+    def _drain(self, pending: queue.Queue) -> List[Tuple]:
+        """Pop everything currently waiting in a write queue"""
+        batch = []
+        while True:
+            try:
+                batch.append(pending.get_nowait())
+            except queue.Empty:
+                return batch
+    
+    def db_writer(self):
+        """Write queued alerts and statistics every DB_FLUSH_INTERVAL or DB_BATCH_SIZE alerts"""
+        while True:
+            alerts = []
+            deadline = time.monotonic() + self.config['DB_FLUSH_INTERVAL']
+            while len(alerts) < self.config['DB_BATCH_SIZE']:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    alerts.append(self._alert_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.write_batch(alerts, self._drain(self._stats_queue))
+    
+    def flush_writes(self):
+        """Write everything still queued, e.g. on shutdown"""
+        self.write_batch(self._drain(self._alert_queue), self._drain(self._stats_queue))
+    
+    def write_batch(self, alerts: List[Tuple], stats: List[Tuple]):
+        """Insert alerts and statistics rows in a single transaction"""
+        if not alerts and not stats:
+            return
+        
         try:
-            conn = sqlite3.connect(self.config['DB_FILE'])
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO threats (timestamp, threat_type, severity, source_ip, description, confidence)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (alert.timestamp, alert.threat_type, alert.severity, 
-                  alert.source_ip, alert.description, alert.confidence))
-            
-            conn.commit()
-            conn.close()
+            with self._db_lock:
+                cursor = self.db_conn.cursor()
+                # Take the write lock up front rather than upgrading mid-transaction
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.executemany('''
+                        INSERT INTO threats (timestamp, threat_type, severity, source_ip, description, confidence)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', alerts)
+                    cursor.executemany('''
+                        INSERT INTO network_stats (timestamp, total_packets, unique_ips, suspicious_activities)
+                        VALUES (?, ?, ?, ?)
+                    ''', stats)
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
         except Exception as e:
-            self.logger.error(f"Error storing threat alert: {e}")
+            self.logger.error(f"Error writing {len(alerts)} alerts / {len(stats)} stats to database: {e}")
     
     def respond_to_threat(self, alert: ThreatAlert):
         """Automated threat response"""
@@ -438,22 +707,16 @@ class WiFiIDS:
         self.logger.info(f"Threat notification sent for {alert.threat_type}")
     
     def update_statistics(self):
-        """Update network statistics"""
-        try:
-            conn = sqlite3.connect(self.config['DB_FILE'])
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO network_stats (timestamp, total_packets, unique_ips, suspicious_activities)
-                VALUES (?, ?, ?, ?)
-            ''', (time.time(), len(self.packet_buffer), 
-                  len(set(p.src_ip for p in self.packet_buffer)), 
-                  len(self.suspicious_ips)))
-            
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            self.logger.error(f"Error updating statistics: {e}")
+        """Queue a network statistics snapshot for the next batched write"""
+        # Forget IPs that have not raised an alert within the TTL
+        cutoff = time.time() - self.config['SUSPICIOUS_IP_TTL']
+        with self._alerts_lock:
+            while self.suspicious_ips and next(iter(self.suspicious_ips.values())) < cutoff:
+                self.suspicious_ips.popitem(last=False)
+        
+        self._stats_queue.put((time.time(), self._count,
+                               int(self._live_sources[0]),
+                               len(self.suspicious_ips)))
     
     def start_monitoring(self):
         """Start network monitoring"""
@@ -464,22 +727,83 @@ class WiFiIDS:
         interface = self.get_network_interface()
         self.logger.info(f"Starting monitoring on interface: {interface}")
         
+        stop = threading.Event()
+        self._capture_stop = stop
         self.is_monitoring = True
         self.start_time = time.time() # Reset start time when monitoring starts
 
         try:
-            # Scapy's sniff function runs in the current thread.
-            # For non-blocking behavior in Flask, this should be called in a separate thread.
-            sniff(
-                iface=interface,
-                prn=self.packet_callback,
-                store=0,
-                stop_filter=lambda x: not self.is_monitoring
-            )
-            self.logger.info("Scapy sniff thread stopped.")
+            with self._capture_lock:
+                if stop.is_set():
+                    return
+                if pcap is not None:
+                    self.capture_with_pcap(interface, stop)
+                else:
+                    self.capture_with_scapy(interface, stop)
         except Exception as e:
             self.logger.error(f"Error during monitoring: {e}")
-            self.is_monitoring = False # Ensure status is set to false on error
+            if self._capture_stop is stop:
+                self.is_monitoring = False # Ensure status is set to false on error
+            self._monitor_started.set() # Don't keep a waiting API request blocked
+    
+    def capture_with_scapy(self, interface: str, stop: threading.Event):
+        """Capture with scapy on its own thread until this session is stopped"""
+        # AsyncSniffer.stop() wakes the sniffer even when no packets arrive, so
+        # a stopped session releases the capture lock straight away
+        sniffer = AsyncSniffer(
+            iface=interface,
+            filter="ip",  # BPF, evaluated in the kernel before scapy dissects anything
+            prn=self.packet_callback,
+            store=False,
+            started_callback=self._monitor_started.set
+        )
+        sniffer.start()
+        
+        # Also notice the sniffer thread dying on its own, e.g. a bad interface
+        while not stop.wait(0.5) and sniffer.thread.is_alive():
+            pass
+        if sniffer.thread.is_alive():
+            sniffer.stop()
+        else:
+            sniffer.join()  # Re-raises the sniffer's error, if any
+        self.logger.info("Scapy sniff thread stopped.")
+    
+    def capture_with_pcap(self, interface: str, stop: threading.Event):
+        """Capture with libpcap in batches and dissect on a worker thread"""
+        # immediate=False lets the kernel buffer packets and hand them over in
+        # batches; the BPF filter drops non-IP traffic before it reaches us.
+        p = pcap.pcap(name=interface, immediate=False, timeout_ms=100)
+        p.setfilter('ip')
+        decoder = conf.l2types.get(p.datalink())
+        if decoder is None:
+            raise ValueError(f"Unsupported link type {p.datalink()} on {interface}")
+        
+        # Raw frames handed from this capture loop to its dissector
+        raw_q = queue.Queue(maxsize=self.config['CAPTURE_QUEUE_SIZE'])
+        dissector = threading.Thread(target=self.dissect_packets, args=(raw_q, decoder, stop), daemon=True)
+        dissector.start()
+        self._monitor_started.set()
+        
+        try:
+            while not stop.is_set():
+                for ts, buf in p.readpkts():
+                    try:
+                        raw_q.put_nowait((ts, buf))
+                    except queue.Full:
+                        self.dropped_packets += 1
+        finally:
+            stop.set()
+            dissector.join()
+        self.logger.info(f"libpcap capture stopped ({self.dropped_packets} packets dropped).")
+    
+    def dissect_packets(self, raw_q: queue.Queue, decoder, stop: threading.Event):
+        """Decode raw frames from the capture queue and analyze them"""
+        while not stop.is_set() or not raw_q.empty():
+            try:
+                ts, buf = raw_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.packet_callback(decoder(buf))
     
     def stop_monitoring(self):
         """Stop network monitoring"""
@@ -488,15 +812,18 @@ class WiFiIDS:
             return
 
         self.is_monitoring = False
+        self._capture_stop.set()
+        self._monitor_started.clear()
         self.logger.info("Monitoring stopped signal sent.")
-        # Scapy's sniff will stop when stop_filter returns True (i.e., self.is_monitoring is False)
+        # The capture loop (AsyncSniffer or libpcap readpkts) exits once it sees its stop event set
     
     def get_status(self) -> Dict:
         """Get current system status"""
         uptime_seconds = time.time() - self.start_time
         return {
             'is_monitoring': self.is_monitoring,
-            'packets_captured': len(self.packet_buffer),
+            'packets_captured': self._count,
+            'unique_ips': int(self._live_sources[0]),
             'threat_alerts': len(self.threat_alerts),
             'suspicious_ips': len(self.suspicious_ips),
             'uptime': uptime_seconds
@@ -504,41 +831,50 @@ class WiFiIDS:
     
     def get_recent_alerts(self, hours: int = 24) -> List[Dict]:
         """Get recent threat alerts"""
-        # Fetch from database for persistence
-        conn = sqlite3.connect(self.config['DB_FILE'])
-        cursor = conn.cursor()
-        
         cutoff_time = time.time() - (hours * 3600)
-        cursor.execute('SELECT timestamp, threat_type, severity, source_ip, description, confidence FROM threats WHERE timestamp > ? ORDER BY timestamp DESC', (cutoff_time,))
         
-        recent_alerts_db = []
-        for row in cursor.fetchall():
-            recent_alerts_db.append({
-                "timestamp": row[0],
-                "threat_type": row[1],
-                "severity": row[2],
-                "source_ip": row[3],
-                "description": row[4],
-                "confidence": row[5]
-            })
+        # Serve from memory when the in-memory history reaches back past the
+        # cutoff, i.e. it holds every alert in the requested window
+        with self._alerts_lock:
+            history = list(self.threat_alerts)
+        if history and history[0].timestamp <= cutoff_time:
+            recent = itertools.takewhile(lambda alert: alert.timestamp > cutoff_time, reversed(history))
+            return [asdict(alert) for alert in recent]
+        
+        # Fetch from database for persistence
+        with self._db_lock:
+            rows = self.db_conn.cursor().execute(
+                'SELECT timestamp, threat_type, severity, source_ip, description, confidence FROM threats WHERE timestamp > ? ORDER BY timestamp DESC',
+                (cutoff_time,)
+            ).fetchall()
         
-        conn.close()
-        return recent_alerts_db
+        columns = ("timestamp", "threat_type", "severity", "source_ip", "description", "confidence")
+        return [dict(zip(columns, row)) for row in rows]
 
 # Web Dashboard
 app = Flask(__name__)
 CORS(app) # Enable CORS for all routes
 
+_DASH_HTML = b"<h1>WiFi IDS Backend Running</h1><p>Frontend is served by React.</p>"
+
+# get_status() result shared by status polls arriving within STATUS_CACHE_TTL seconds
+STATUS_CACHE_TTL = 0.25
+_status_cache = {'expires': 0.0, 'status': None}
+
 @app.route('/')
 def dashboard():
     """Main dashboard page - No longer needed as React serves the frontend"""
     # This route is now primarily for testing or if you want to keep a basic HTML fallback
-    return render_template_string("<h1>WiFi IDS Backend Running</h1><p>Frontend is served by React.</p>")
+    return Response(_DASH_HTML, mimetype='text/html')
 
 @app.route('/api/status')
 def api_status():
     """API endpoint for system status"""
-    return jsonify(ids_instance.get_status())
+    now = time.monotonic()
+    if now >= _status_cache['expires']:
+        _status_cache['status'] = ids_instance.get_status()
+        _status_cache['expires'] = now + STATUS_CACHE_TTL
+    return jsonify(_status_cache['status'])
 
 @app.route('/api/alerts')
 def api_alerts():
@@ -551,9 +887,11 @@ def api_start_monitoring():
     if not ids_instance.is_monitoring:
         # Start monitoring in a new thread to avoid blocking the API response
         # This is crucial because scapy's sniff is blocking
+        ids_instance._monitor_started.clear()
         threading.Thread(target=ids_instance.start_monitoring, daemon=True).start()
-        # Give a small delay for the thread to start and update status
-        time.sleep(0.1) 
+        # Wait until the capture loop is running so the reported status is accurate
+        ids_instance._monitor_started.wait(timeout=1.0)
+        _status_cache['expires'] = 0.0
         return jsonify({"status": "Monitoring started", "is_monitoring": ids_instance.is_monitoring}), 200
     return jsonify({"status": "Monitoring already active", "is_monitoring": ids_instance.is_monitoring}), 200
 
@@ -562,8 +900,7 @@ def api_stop_monitoring():
     """API endpoint to stop network monitoring"""
     if ids_instance.is_monitoring:
         ids_instance.stop_monitoring()
-        # Give a small delay for the monitoring status to update
-        time.sleep(0.1)
+        _status_cache['expires'] = 0.0
         return jsonify({"status": "Monitoring stopped", "is_monitoring": ids_instance.is_monitoring}), 200
     return jsonify({"status": "Monitoring already inactive", "is_monitoring": ids_instance.is_monitoring}), 200
 
@@ -604,6 +941,7 @@ def main():
         print("\nShutting down WiFi IDS...")
         if ids_instance:
             ids_instance.stop_monitoring()
+            ids_instance.flush_writes()
         print("WiFi IDS stopped.")
 
 if __name__ == "__main__":
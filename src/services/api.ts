@@ -4,6 +4,7 @@ const API_BASE_URL = 'http://localhost:5000';
 export interface SystemStatus {
   is_monitoring: boolean;
   packets_captured: number;
+  unique_ips: number;
   threat_alerts: number;
   suspicious_ips: number;
   uptime: number;